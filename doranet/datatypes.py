@@ -1,10 +1,11 @@
 """Contains classes which define and implement molecule-operator data units."""
 
-import builtins
 import collections.abc
-import io
-import pickle
+import functools
+import struct
+import sys
 import typing
+import weakref
 
 import rdkit
 import rdkit.Chem
@@ -16,40 +17,45 @@ import rdkit.Chem.rdmolops
 
 from doranet import interfaces
 
-# some code to make loads more safe to arbitrary code execution
-# necessary since external data from a database may be input
-# if you are having issues, add relevant classes to _safe_%module%_classes
-# or if modules not in builtins required, add other if clauses
-_safe_builtins_classes: frozenset[str] = frozenset(
-    {
-        "frozenset",
-        "tuple",
-    }
-)
-
-
-class __SafeUnpickler(pickle.Unpickler):
-    def find_class(self, module: str, name: str) -> typing.Any:
-        if module == "builtins" and name in _safe_builtins_classes:
-            return getattr(builtins, name)
-        raise pickle.UnpicklingError(f"global '{module}.{name}' is forbidden")
+# compact length-prefixed codec for operator blobs; avoids running the pickle
+# virtual machine (and its attack surface) on data which is just a SMARTS
+# string plus two boolean flags
+_op_blob_header = struct.Struct("<I")
+_OP_FLAG_KEKULIZE = 1
+_OP_FLAG_DROP_ERRORS = 2
+
+
+def _pack_op(smarts: str, kekulize: bool, drop_errors: bool) -> bytes:
+    smarts_bytes = smarts.encode("utf-8")
+    flags = 0
+    if kekulize:
+        flags |= _OP_FLAG_KEKULIZE
+    if drop_errors:
+        flags |= _OP_FLAG_DROP_ERRORS
+    return (
+        _op_blob_header.pack(len(smarts_bytes)) + smarts_bytes + bytes((flags,))
+    )
 
 
-def _loads(string_in: bytes) -> typing.Any:
-    return __SafeUnpickler(io.BytesIO(string_in)).load()
+def _unpack_op(data: bytes) -> tuple[str, bool, bool]:
+    buf = memoryview(data)
+    (num_bytes,) = _op_blob_header.unpack_from(buf)
+    offset = _op_blob_header.size
+    smarts = str(buf[offset : offset + num_bytes], "utf-8")
+    flags = buf[offset + num_bytes]
+    return (
+        smarts,
+        bool(flags & _OP_FLAG_KEKULIZE),
+        bool(flags & _OP_FLAG_DROP_ERRORS),
+    )
 
-    # @final
-    # def __getstate__(self) -> bytes:
-    #     """
-    #     Serializes object based on blob property.
-    #     """
-    #     return self.blob
 
-    # @abstractmethod
-    # def __setstate__(self, data: bytes) -> None:
-    #     """
-    #     Deserializes object from blob.
-    #     """
+@functools.lru_cache(maxsize=65536)
+def _blob_to_smiles(blob: bytes) -> str:
+    """Canonicalize a binary molecule blob, caching repeat molecules."""
+    return sys.intern(
+        rdkit.Chem.rdmolfiles.MolToSmiles(rdkit.Chem.rdchem.Mol(blob))
+    )
 
 
 @typing.final
@@ -60,8 +66,9 @@ class MolDatBasicV1(interfaces.MolDatRDKit):
     Speeds: 5
     """
 
-    __slots__ = ("_blob", "_smiles")
+    __slots__ = ("_blob", "_mol_ref", "_smiles")
     _blob: bytes
+    _mol_ref: typing.Optional["weakref.ref[rdkit.Chem.rdchem.Mol]"]
     _smiles: str
 
     def __init__(
@@ -70,12 +77,19 @@ class MolDatBasicV1(interfaces.MolDatRDKit):
         sanitize: bool = True,
         neutralize: bool = False,
     ) -> None:
+        self._mol_ref = None
+        if isinstance(molecule, bytes):
+            self._blob = molecule
+            self._smiles = _blob_to_smiles(molecule)
+            return
         rdkitmol = self._processinput(molecule, sanitize, neutralize)
         self._buildfrommol(rdkitmol)
 
     def _buildfrommol(self, in_val: rdkit.Chem.rdchem.Mol) -> None:
-        self._blob = in_val.ToBinary()
-        self._smiles = rdkit.Chem.rdmolfiles.MolToSmiles(in_val)
+        self._blob = in_val.ToBinary(
+            rdkit.Chem.rdchem.PropertyPickleOptions.NoProps
+        )
+        self._smiles = sys.intern(rdkit.Chem.rdmolfiles.MolToSmiles(in_val))
 
     @property
     def blob(self) -> bytes:
@@ -87,7 +101,29 @@ class MolDatBasicV1(interfaces.MolDatRDKit):
 
     @property
     def rdkitmol(self) -> rdkit.Chem.rdchem.Mol:
-        return rdkit.Chem.rdchem.Mol(self._blob)
+        # reuse the previously parsed mol if a caller still holds it; the
+        # weak reference keeps this class from caching the mol outright
+        if self._mol_ref is not None:
+            rdkitmol = self._mol_ref()
+            if rdkitmol is not None:
+                return rdkitmol
+        rdkitmol = rdkit.Chem.rdchem.Mol(self._blob)
+        self._mol_ref = weakref.ref(rdkitmol)
+        return rdkitmol
+
+    def __getstate__(self) -> tuple[bytes, str]:
+        # the weak molecule reference is transient and unpicklable
+        return (self._blob, self._smiles)
+
+    def __setstate__(self, state: tuple[typing.Any, typing.Any]) -> None:
+        self._mol_ref = None
+        if state[0] is None and isinstance(state[1], dict):
+            # networks saved before __getstate__ was defined pickled slots
+            # by name as (None, {slot: value})
+            self._blob = state[1]["_blob"]
+            self._smiles = state[1]["_smiles"]
+            return
+        self._blob, self._smiles = state
 
     @property
     def smiles(self) -> str:
@@ -109,11 +145,18 @@ class MolDatBasicV2(interfaces.MolDatRDKit):
     Speeds: 1,3,4,6
     """
 
-    __slots__ = ("_blob", "_inchikey", "_rdkitmol", "_smiles")
+    __slots__ = (
+        "_blob",
+        "_inchikey",
+        "_kekulized_mol",
+        "_rdkitmol",
+        "_smiles",
+    )
     _blob: typing.Optional[bytes]
     _inchikey: typing.Optional[str]
+    _kekulized_mol: typing.Optional[rdkit.Chem.rdchem.Mol]
     _rdkitmol: rdkit.Chem.rdchem.Mol
-    _smiles: str
+    _smiles: typing.Optional[str]
 
     def __init__(
         self,
@@ -123,17 +166,32 @@ class MolDatBasicV2(interfaces.MolDatRDKit):
     ) -> None:
         self._blob = None
         self._inchikey = None
+        self._kekulized_mol = None
+        if isinstance(molecule, bytes):
+            self._blob = molecule
+            self._rdkitmol = rdkit.Chem.rdchem.Mol(molecule)
+            self._smiles = None
+            return
         rdkitmol = self._processinput(molecule, sanitize, neutralize)
         self._buildfrommol(rdkitmol)
 
     def _buildfrommol(self, in_val: rdkit.Chem.rdchem.Mol) -> None:
         self._rdkitmol = in_val
-        self._smiles = rdkit.Chem.rdmolfiles.MolToSmiles(in_val)
+        self._smiles = None
+
+    def __setstate__(self, state: tuple[typing.Any, typing.Any]) -> None:
+        # networks saved before _kekulized_mol was added lack its entry in
+        # the pickled slot dict
+        self._kekulized_mol = None
+        for slot, value in state[1].items():
+            setattr(self, slot, value)
 
     @property
     def blob(self) -> bytes:
         if self._blob is None:
-            self._blob = self._rdkitmol.ToBinary()
+            self._blob = self._rdkitmol.ToBinary(
+                rdkit.Chem.rdchem.PropertyPickleOptions.NoProps
+            )
         return self._blob
 
     @property
@@ -146,18 +204,101 @@ class MolDatBasicV2(interfaces.MolDatRDKit):
     def rdkitmol(self) -> rdkit.Chem.rdchem.Mol:
         return self._rdkitmol
 
+    @property
+    def rdkitmol_kekulized(self) -> rdkit.Chem.rdchem.Mol:
+        if self._kekulized_mol is None:
+            rdkitmol = rdkit.Chem.rdchem.Mol(self._rdkitmol)
+            rdkit.Chem.rdmolops.Kekulize(rdkitmol, clearAromaticFlags=True)
+            self._kekulized_mol = rdkitmol
+        return self._kekulized_mol
+
     @property
     def smiles(self) -> str:
+        if self._smiles is None:
+            if self._blob is not None:
+                self._smiles = _blob_to_smiles(self._blob)
+            else:
+                self._smiles = sys.intern(
+                    rdkit.Chem.rdmolfiles.MolToSmiles(self._rdkitmol)
+                )
         return self._smiles
 
     @property
     def uid(self) -> str:
-        return self._smiles
+        return self.smiles
 
     def __repr__(self) -> str:
         return f'MolDatBasic("{self.smiles}")'
 
 
+def _split_top_level_fragments(smarts: str) -> list[str]:
+    """
+    Split a SMARTS string on dots outside any bracket or parenthesis.
+
+    Dots nested in recursive SMARTS (e.g. within "[$(...)]") are fragment
+    separators only for the nested query and must not split the template.
+    """
+    fragments: list[str] = []
+    depth = 0
+    start = 0
+    for position, char in enumerate(smarts):
+        if char in "([":
+            depth += 1
+        elif char in ")]":
+            depth -= 1
+        elif char == "." and depth == 0:
+            fragments.append(smarts[start:position])
+            start = position + 1
+    fragments.append(smarts[start:])
+    return fragments
+
+
+def _reorder_template_fragments(
+    rxn: rdkit.Chem.rdChemReactions.ChemicalReaction,
+) -> rdkit.Chem.rdChemReactions.ChemicalReaction:
+    """
+    Sort disconnected reactant template fragments from largest to smallest.
+
+    RDKit substructure matching explores fragments of a disconnected query
+    in order, and putting many small fragments before a large one can make
+    the search combinatorial.  Reordering fragments largest-first is
+    semantically neutral (all fragments of one template must match the same
+    molecule) but avoids the pathological search order regardless of how
+    the user wrote the SMARTS.
+    """
+    templates: list[rdkit.Chem.rdchem.Mol] = []
+    changed = False
+    for template in rxn.GetReactants():
+        smarts = rdkit.Chem.rdmolfiles.MolToSmarts(template)
+        fragments = _split_top_level_fragments(smarts)
+        reparsed = None
+        if len(fragments) > 1:
+            reordered = ".".join(sorted(fragments, key=len, reverse=True))
+            if reordered != smarts:
+                reparsed = rdkit.Chem.rdmolfiles.MolFromSmarts(reordered)
+        if reparsed is None:
+            templates.append(template)
+        else:
+            templates.append(reparsed)
+            changed = True
+    if not changed:
+        return rxn
+    new_rxn = rdkit.Chem.rdChemReactions.ChemicalReaction()
+    for template in templates:
+        new_rxn.AddReactantTemplate(template)
+    for template in rxn.GetAgents():
+        new_rxn.AddAgentTemplate(template)
+    for template in rxn.GetProducts():
+        new_rxn.AddProductTemplate(template)
+    return new_rxn
+
+
+# process-wide cache of reactant template mols, keyed by operator SMARTS, so
+# equivalent operators recreated in each worker share one set of templates;
+# cached templates must never be mutated
+_template_cache: dict[str, tuple[rdkit.Chem.rdchem.Mol, ...]] = {}
+
+
 @typing.final
 class OpDatBasic(interfaces.OpDatRDKit):
     """
@@ -211,34 +352,47 @@ class OpDatBasic(interfaces.OpDatRDKit):
         engine: interfaces.NetworkEngine,
         kekulize: bool = False,
         drop_errors: bool = False,
+        normalize_fragment_order: bool = True,
     ) -> None:
-        if isinstance(operator, rdkit.Chem.rdChemReactions.ChemicalReaction):
-            self._rdkitrxn = operator
-            self._kekulize = kekulize
-            self._drop_errors = drop_errors
-        elif isinstance(operator, str):
-            self._rdkitrxn = rdkit.Chem.rdChemReactions.ReactionFromSmarts(
-                operator
-            )
-            self._kekulize = kekulize
-            self._drop_errors = drop_errors
-            # SanitizeRxn(self._rdkitrxn)
-        elif isinstance(operator, bytes):
-            self._rdkitrxn, self._kekulize, self._drop_errors = _loads(operator)
-            self._blob = operator
-        else:
-            raise NotImplementedError("Invalid operator type")
+        self._kekulize = kekulize
+        self._drop_errors = drop_errors
+        self._blob = None
+        init = _op_init_dispatch.get(type(operator))
+        if init is None:
+            # subclasses of the dispatch types miss the exact-type fast path
+            for cls, candidate in _op_init_dispatch.items():
+                if isinstance(operator, cls):
+                    init = candidate
+                    break
+            else:
+                raise NotImplementedError("Invalid operator type")
+        init(self, operator)
+        if normalize_fragment_order:
+            self._rdkitrxn = _reorder_template_fragments(self._rdkitrxn)
         self._templates = None
         self._engine = engine
-        self._blob = None
         self._smarts = None
         self._uid = None
 
+    def _init_from_rdkit(
+        self, operator: rdkit.Chem.rdChemReactions.ChemicalReaction
+    ) -> None:
+        self._rdkitrxn = operator
+
+    def _init_from_smarts(self, operator: str) -> None:
+        self._rdkitrxn = rdkit.Chem.rdChemReactions.ReactionFromSmarts(operator)
+        # SanitizeRxn(self._rdkitrxn)
+
+    def _init_from_blob(self, operator: bytes) -> None:
+        smarts, self._kekulize, self._drop_errors = _unpack_op(operator)
+        self._rdkitrxn = rdkit.Chem.rdChemReactions.ReactionFromSmarts(smarts)
+        self._blob = operator
+
     @property
     def blob(self) -> bytes:
         if self._blob is None:
-            self._blob = pickle.dumps(
-                (self.rdkitrxn, self._kekulize, self._drop_errors)
+            self._blob = _pack_op(
+                self.smarts, self._kekulize, self._drop_errors
             )
         return self._blob
 
@@ -266,10 +420,7 @@ class OpDatBasic(interfaces.OpDatRDKit):
         if self._templates is None:
             self._templates = self._build_templates()
         if isinstance(mol, interfaces.MolDatRDKit):
-            tempmol = mol.rdkitmol
-            if self._kekulize:
-                tempmol = rdkit.Chem.rdchem.Mol(tempmol)
-                rdkit.Chem.rdmolops.Kekulize(tempmol, clearAromaticFlags=True)
+            tempmol = mol.rdkitmol_kekulized if self._kekulize else mol.rdkitmol
             return tempmol.HasSubstructMatch(
                 self._templates[arg], useChirality=True
             )
@@ -277,16 +428,16 @@ class OpDatBasic(interfaces.OpDatRDKit):
             return False
 
     def _build_templates(self) -> tuple[rdkit.Chem.rdchem.Mol, ...]:
-        return tuple(self._rdkitrxn.GetReactants())
+        templates = _template_cache.get(self.smarts)
+        if templates is None:
+            templates = tuple(self._rdkitrxn.GetReactants())
+            _template_cache[self.smarts] = templates
+        return templates
 
     def _attempt_reaction(
         self, mols: collections.abc.Iterable[rdkit.Chem.rdchem.Mol]
     ) -> collections.abc.Iterable[rdkit.Chem.rdchem.Mol]:
-        try:
-            return self._rdkitrxn.RunReactants(mols, maxProducts=0)
-        except Exception as err:
-            print(type(err))
-            raise err
+        return self._rdkitrxn.RunReactants(mols, maxProducts=0)
 
     def _process_new_mol(self, mol) -> interfaces.MolDatRDKit | None:
         if self._drop_errors:
@@ -296,20 +447,11 @@ class OpDatBasic(interfaces.OpDatRDKit):
                 return None
         return self._engine.mol.rdkit(mol)
 
-    def __call__(
-        self, *reactants: interfaces.MolDatBase
+    def _react(
+        self,
+        rdkitmols: collections.abc.Sequence[rdkit.Chem.rdchem.Mol],
+        reactants: collections.abc.Sequence[interfaces.MolDatBase],
     ) -> tuple[tuple[interfaces.MolDatBase, ...], ...]:
-        rdkitmols: list[rdkit.Chem.rdchem.Mol] = [
-            reactant.rdkitmol
-            for reactant in reactants
-            if isinstance(reactant, interfaces.MolDatRDKit)
-        ]
-        if self._kekulize:
-            rdkitmols = [
-                rdkit.Chem.rdchem.Mol(rdkitmol) for rdkitmol in rdkitmols
-            ]
-            for rdkitmol in rdkitmols:
-                rdkit.Chem.rdmolops.Kekulize(rdkitmol, clearAromaticFlags=True)
         try:
             return tuple(
                 product_set  # type: ignore [misc]
@@ -328,6 +470,72 @@ class OpDatBasic(interfaces.OpDatRDKit):
                 f"Error occurred when using operator {self} on {reactants}"
             ) from err
 
+    def __call__(
+        self, *reactants: interfaces.MolDatBase
+    ) -> tuple[tuple[interfaces.MolDatBase, ...], ...]:
+        # rdkitmol_kekulized is cached by the molecule where possible and is
+        # not mutated by RunReactants, so no defensive copy is needed here
+        rdkitmols: list[rdkit.Chem.rdchem.Mol] = [
+            reactant.rdkitmol_kekulized if self._kekulize else reactant.rdkitmol
+            for reactant in reactants
+            if isinstance(reactant, interfaces.MolDatRDKit)
+        ]
+        return self._react(rdkitmols, reactants)
+
+    def call_batch(
+        self,
+        reactant_sets: collections.abc.Iterable[
+            collections.abc.Sequence[interfaces.MolDatBase]
+        ],
+    ) -> collections.abc.Generator[
+        tuple[tuple[interfaces.MolDatBase, ...], ...], None, None
+    ]:
+        """
+        React several reactant combinations using the internal operator.
+
+        Equivalent to calling the operator once per reactant combination,
+        except that each distinct molecule object is kekulized at most once
+        regardless of how many combinations it appears in, and product sets
+        are yielded lazily so that consumers may stream results without
+        materializing the full batch.
+
+        Parameters
+        ----------
+        reactant_sets : collections.abc.Iterable[collections.abc.Sequence]
+            Reactant combinations of MolDatBase objects, each combination
+            matching the arguments in the operator.
+
+        Yields
+        ------
+        tuple[tuple[interfaces.MolDatBase, ...], ...]
+            Reaction product sets for each reactant combination, in order.
+        """
+        # keyed by the molecule object itself (identity hash); keeping the
+        # molecule alive as a key prevents a recycled id from serving a
+        # stale kekulized mol when reactant_sets is a generator
+        kekulized: dict[interfaces.MolDatRDKit, rdkit.Chem.rdchem.Mol] = {}
+        for reactants in reactant_sets:
+            mols = [
+                reactant
+                for reactant in reactants
+                if isinstance(reactant, interfaces.MolDatRDKit)
+            ]
+            rdkitmols: list[rdkit.Chem.rdchem.Mol]
+            if self._kekulize:
+                rdkitmols = []
+                for reactant in mols:
+                    # the batch-local map keeps molecule types which do not
+                    # cache their kekulized form from recomputing it per
+                    # combination
+                    rdkitmol = kekulized.get(reactant)
+                    if rdkitmol is None:
+                        rdkitmol = reactant.rdkitmol_kekulized
+                        kekulized[reactant] = rdkitmol
+                    rdkitmols.append(rdkitmol)
+            else:
+                rdkitmols = [reactant.rdkitmol for reactant in mols]
+            yield self._react(rdkitmols, tuple(reactants))
+
     def __len__(self) -> int:
         return (
             self._rdkitrxn.GetNumReactantTemplates()
@@ -344,3 +552,14 @@ class OpDatBasic(interfaces.OpDatRDKit):
         if self._kekulize:
             sval = sval + ",kekulize"
         return sval
+
+
+# operator type -> initializer dispatch; a single exact-type dict probe
+# replaces the isinstance ladder on the constructor hot path
+_op_init_dispatch: dict[
+    type, collections.abc.Callable[[OpDatBasic, typing.Any], None]
+] = {
+    rdkit.Chem.rdChemReactions.ChemicalReaction: OpDatBasic._init_from_rdkit,
+    str: OpDatBasic._init_from_smarts,
+    bytes: OpDatBasic._init_from_blob,
+}
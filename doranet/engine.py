@@ -55,6 +55,7 @@ class _rdkit_op_init(typing.NamedTuple):
         ],
         kekulize: bool = False,
         drop_errors=False,
+        normalize_fragment_order: bool = True,
     ) -> interfaces.OpDatRDKit:
         """
         Create an object which manages an RDKit SMARTS operator.
@@ -74,12 +75,17 @@ class _rdkit_op_init(typing.NamedTuple):
         drop_errors : bool (default: False)
             Reaction products which generate errors are dropped instead of
             being re-raised.
+        normalize_fragment_order : bool (default: True)
+            Whether to reorder disconnected reactant template fragments
+            largest-first for matching efficiency.  Disable to preserve the
+            operator uid of a SMARTS written in a different fragment order.
         """
         return self.optype(
             operator=operator,
             engine=self.engine,
             kekulize=kekulize,
             drop_errors=drop_errors,
+            normalize_fragment_order=normalize_fragment_order,
         )
 
 
@@ -172,12 +178,14 @@ class NetworkEngineBasic(interfaces.NetworkEngine):
         ],
         kekulize: bool = False,
         drop_errors: bool = False,
+        normalize_fragment_order: bool = True,
     ) -> datatypes.OpDatBasic:
         return self._Op(
             operator=operator,
             engine=self,
             kekulize=kekulize,
             drop_errors=drop_errors,
+            normalize_fragment_order=normalize_fragment_order,
         )
 
     @property
@@ -279,6 +279,23 @@ class MolDatRDKit(MolDatBase):
             RDKit molecule, generated from RDKit.
         """
 
+    @property
+    def rdkitmol_kekulized(self) -> rdkit.Chem.rdchem.Mol:
+        """
+        Kekulized form of RDKit molecule object.
+
+        Aromatic flags are cleared.  Implementations may return a shared
+        cached molecule, so the result must not be mutated.
+
+        Returns
+        -------
+        rdkit.Chem.rdchem.Mol
+            Kekulized RDKit molecule, generated from RDKit.
+        """
+        rdkitmol = rdkit.Chem.rdchem.Mol(self.rdkitmol)
+        rdkit.Chem.rdmolops.Kekulize(rdkitmol, clearAromaticFlags=True)
+        return rdkitmol
+
     @property
     @abc.abstractmethod
     def smiles(self) -> str:
@@ -449,6 +466,7 @@ class OpDatRDKit(OpDatBase):
         engine: "NetworkEngine",
         kekulize: bool = False,
         drop_errors: bool = False,
+        normalize_fragment_order: bool = True,
     ) -> None: ...
 
     @classmethod
@@ -476,11 +494,7 @@ class OpDatRDKit(OpDatBase):
         pickaxe_generic.interfaces.OpDatRDKit
             Operator returned from processing bytestring.
         """
-        unpacked: tuple[rdkit.Chem.rdChemReactions.ChemicalReaction, bool] = (
-            pickle.loads(data)
-        )
-        operator, kekulize = unpacked
-        return engine.op.rdkit(operator, kekulize)
+        return engine.op.rdkit(data)
 
     @property
     @abc.abstractmethod
@@ -1458,6 +1472,7 @@ class _op_init_type_rdkit(typing.Protocol):
         ],
         kekulize: bool = False,
         drop_errors: bool = False,
+        normalize_fragment_order: bool = True,
     ) -> OpDatRDKit:
         """
         Create an object which manages an RDKit SMARTS operator.
@@ -1477,6 +1492,10 @@ class _op_init_type_rdkit(typing.Protocol):
         drop_errors : bool (default: False)
             Reaction products which generate errors are dropped instead of
             being re-raised.
+        normalize_fragment_order : bool (default: True)
+            Whether to reorder disconnected reactant template fragments
+            largest-first for matching efficiency.  Disable to preserve the
+            operator uid of a SMARTS written in a different fragment order.
         """
 
 
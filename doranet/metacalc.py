@@ -4,6 +4,7 @@ import collections.abc
 import dataclasses
 import typing
 
+import numpy as np
 import rdkit.Chem.rdMolDescriptors
 
 from doranet import interfaces, metadata
@@ -36,17 +37,16 @@ class GenerationCalculator(metadata.MolPropertyFromRxnCalc[int]):
         rxn: interfaces.ReactionExplicit,
         prev_value: typing.Optional[int] = None,
     ) -> typing.Optional[int]:
-        if data in rxn.reactants:
+        if data in rxn.reactants or not rxn.reactants:
             return None
-        cur_gen = None
+        gen_key = self.gen_key
+        reactant_gens: list[int] = []
         for reactant in rxn.reactants:
-            if reactant.meta is None or self.gen_key not in reactant.meta:
+            meta = reactant.meta
+            if meta is None or gen_key not in meta:
                 return None
-            if cur_gen is None:
-                cur_gen = reactant.meta[self.gen_key] + 1
-            cur_gen = max(cur_gen, reactant.meta[self.gen_key] + 1)
-        if cur_gen is None:
-            return None
+            reactant_gens.append(meta[gen_key])
+        cur_gen = max(reactant_gens) + 1
         if prev_value is not None and prev_value < cur_gen:
             return None
         if (
@@ -57,6 +57,46 @@ class GenerationCalculator(metadata.MolPropertyFromRxnCalc[int]):
             return None
         return cur_gen
 
+    def batch_call(
+        self,
+        reactant_gens: np.ndarray,
+        prev_values: np.ndarray,
+        data_gens: np.ndarray,
+    ) -> np.ndarray:
+        """
+        Calculate new product generations for a batch of reactions at once.
+
+        Vectorized equivalent of calling this calculator once per reaction;
+        callers accumulate per-layer arrays and resolve the whole layer with
+        a single reduction.  A generation of -1 is used in place of None.
+
+        Parameters
+        ----------
+        reactant_gens : np.ndarray
+            Integer array of shape (n_rxns, max_reactants) containing the
+            generation of each reactant, right-padded with -1 for reactions
+            with fewer reactants.  Each row must contain at least one
+            non-negative entry.
+        prev_values : np.ndarray
+            Integer array of shape (n_rxns,) containing the previously
+            calculated generation of the product molecule, or -1 if none.
+        data_gens : np.ndarray
+            Integer array of shape (n_rxns,) containing the generation
+            already stored in the product molecule's metadata, or -1 if
+            none.
+
+        Returns
+        -------
+        np.ndarray
+            Integer array of shape (n_rxns,) containing the new generation
+            of the product molecule for each reaction, or -1 where no update
+            should occur.
+        """
+        new_gens = reactant_gens.max(axis=1) + 1
+        mask = (prev_values < 0) | (new_gens <= prev_values)
+        mask &= (data_gens < 0) | (new_gens < data_gens)
+        return np.where(mask, new_gens, -1)
+
 
 @typing.final
 @dataclasses.dataclass(frozen=True, slots=True)
@@ -809,13 +809,16 @@ def metalib_to_rxn_meta(
     for meta_key, op_dict in metalib.op_info.items():
         for op_id, key_val in op_dict.data.items():
             op_info[op_id][meta_key] = key_val
+    # uid assembles operator and molecule identifiers into tuples on every
+    # access, so compute it only once per reaction
+    rxn_uids = tuple(rxn[0].uid for rxn in rxns)
     rxn_info: dict[
         interfaces.Identifier, dict[collections.abc.Hashable, typing.Any]
-    ] = {rxn[0].uid: dict() for rxn in rxns}
+    ] = {rxn_uid: dict() for rxn_uid in rxn_uids}
     for meta_key, rxn_dict in metalib.rxn_info.items():
         for rxn_id, key_val in rxn_dict.data.items():
             rxn_info[rxn_id][meta_key] = key_val
-    for rxn, passed_filter in rxns:
+    for (rxn, passed_filter), rxn_uid in zip(rxns, rxn_uids, strict=True):
         yield (
             interfaces.ReactionExplicit(
                 interfaces.DataPacketE(
@@ -837,7 +840,7 @@ def metalib_to_rxn_meta(
                 ),
                 _mmd(
                     rxn.reaction_meta,
-                    rxn_info[rxn.uid],
+                    rxn_info[rxn_uid],
                 ),
             ),
             passed_filter,
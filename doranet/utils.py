@@ -75,7 +75,7 @@ class RxnTrackerDepthFirstNetwork(interfaces.RxnTrackerNetwork):
             if rxncombo in tested_combos:
                 continue
             else:
-                tested_combos.add(frozenset(rxncombo))
+                tested_combos.add(rxncombo)
             required_reagents = set(
                 mol
                 for mol in itertools.chain(
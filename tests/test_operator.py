@@ -0,0 +1,55 @@
+"""Test operator data classes."""
+
+import doranet as dn
+
+
+def test_blob_round_trip():
+    engine = dn.create_engine()
+    op = engine.op.rdkit("[C:1]=[C:2]>>[*:1]-[*:2]")
+    op_restored = engine.op.rdkit(op.blob)
+
+    assert op_restored.uid == op.uid
+    assert op_restored.blob == op.blob
+
+
+def test_blob_round_trip_flags():
+    engine = dn.create_engine()
+    op = engine.op.rdkit(
+        "[C:1]=[C:2]>>[*:1]-[*:2]", kekulize=True, drop_errors=True
+    )
+    op_restored = engine.op.rdkit(op.blob)
+
+    assert op_restored.uid == op.uid
+    assert op_restored.blob == op.blob
+
+    benzene = engine.mol.rdkit("c1ccccc1")
+    assert op_restored.compat(benzene, 0) == op.compat(benzene, 0)
+    assert [
+        tuple(mol.uid for mol in products) for products in op_restored(benzene)
+    ] == [tuple(mol.uid for mol in products) for products in op(benzene)]
+
+
+def test_fragment_reorder_equivalent_products():
+    engine = dn.create_engine()
+    smarts = "([O&H1:1].[C:2]=[C:3])>>[O:1][C:2]-[C:3]"
+    op_norm = engine.op.rdkit(smarts)
+    op_raw = engine.op.rdkit(smarts, normalize_fragment_order=False)
+
+    assert op_norm.uid == "([C:2]=[C:3].[O&H1:1])>>[O:1][C:2]-[C:3]"
+    assert op_raw.uid == smarts
+
+    mol = engine.mol.rdkit("OCCC=CC")
+    assert sorted(
+        tuple(product.uid for product in products) for products in op_norm(mol)
+    ) == sorted(
+        tuple(product.uid for product in products) for products in op_raw(mol)
+    )
+
+
+def test_fragment_reorder_preserves_recursive_smarts():
+    engine = dn.create_engine()
+    smarts = "([$(C.N)&C:1].[C:2]CC)>>[C:1][C:2]CC"
+    op = engine.op.rdkit(smarts)
+
+    assert "$(C.N)" in op.smarts
+    assert op.uid == smarts